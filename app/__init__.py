@@ -4,6 +4,7 @@ Initialization module for the application.
 
 from flask import Flask
 
+from .json_provider import OrjsonProvider
 from .routes import init_routes
 
 
@@ -14,6 +15,7 @@ def create_app():
     Returns: Configured Flask application instance.
     """
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
 
     # Config
     app.config.from_object("app.config.Config")
@@ -0,0 +1,108 @@
+"""Dynamic batching of concurrent inference requests."""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+class DynamicBatcher:  # pylint: disable=too-few-public-methods
+    """
+    Coalesces concurrent single-row requests into one batched model call.
+
+    Requests are queued and picked up by a background thread, which waits
+    up to ``max_wait_ms`` for more requests (and at most ``max_batch_size``
+    of them), stacks their rows into one ``(n, n_features)`` array and
+    runs the model once for the whole batch.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[np.ndarray], Any],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+    ) -> None:
+        """
+        :param run_batch: Function running the model on a ``(n, n_features)``
+            array and returning one output row per input row.
+        :param max_batch_size: Maximum number of requests run together.
+        :param max_wait_ms: Maximum time to wait for a batch to fill up.
+        """
+        self._run_batch = run_batch
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, features: np.ndarray) -> Future:
+        """
+        Queue one row of features for inference.
+
+        :param features: The input features of a single request. They are
+            copied, so the caller may reuse the array.
+
+        :return: A future resolved with the model output for this row.
+        """
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((np.array(features).reshape(-1), future))
+        return future
+
+    def _ensure_worker(self) -> None:
+        """Start the background thread on first use (e.g. after a fork)."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._process, name="dynamic-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[np.ndarray, Future]]:
+        """Block for the next request and gather others arriving in time."""
+        pending = [self._queue.get()]
+        deadline = time.monotonic() + self._max_wait
+
+        while len(pending) < self._max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                pending.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return pending
+
+    def _process(self) -> None:
+        """Run batches until the process exits."""
+        while True:
+            # Skip requests cancelled by callers that stopped waiting
+            pending = [
+                (features, future)
+                for features, future in self._collect()
+                if future.set_running_or_notify_cancel()
+            ]
+            if not pending:
+                continue
+
+            try:
+                batch = np.stack([features for features, _ in pending])
+                outputs = self._run_batch(batch)
+                if len(outputs) != len(pending):
+                    raise RuntimeError(
+                        f"Expected {len(pending)} outputs, got {len(outputs)}"
+                    )
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Every future must be resolved, or its caller waits forever
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), output in zip(pending, outputs):
+                future.set_result(output)
@@ -0,0 +1,265 @@
+"""Native evaluation of the model's tree ensemble."""
+
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import onnx
+from onnx import helper
+
+try:
+    from numba import njit  # type: ignore
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - numba is an optional dependency
+    NUMBA_AVAILABLE = False
+
+# Attributes of the TreeEnsembleClassifier read by export_tree_ensemble.
+# Other encodings (integer class labels, the tensor attributes of
+# ai.onnx.ml v3) are left to ONNX Runtime.
+_REQUIRED_ATTRIBUTES = (
+    "nodes_treeids",
+    "nodes_nodeids",
+    "nodes_featureids",
+    "nodes_modes",
+    "nodes_values",
+    "nodes_truenodeids",
+    "nodes_falsenodeids",
+    "class_treeids",
+    "class_nodeids",
+    "class_ids",
+    "class_weights",
+    "classlabels_strings",
+)
+
+
+def _attributes(node: onnx.NodeProto) -> Dict[str, Any]:
+    """Return the attributes of a node as a dictionary of Python values."""
+    return {a.name: helper.get_attribute_value(a) for a in node.attribute}
+
+
+def _feature_columns(model: onnx.ModelProto, tree_input: str) -> Tuple[List[int], int]:
+    """
+    Map the features seen by the trees to the columns of the model inputs.
+
+    Models either take a single fused (batch, n_features) input, or one
+    (batch, 1) input per feature concatenated in front of the trees.
+
+    :param model: The ONNX model.
+    :param tree_input: Name of the tensor fed to the tree ensemble.
+
+    :return: The input column of every tree feature, and the number of
+        input columns.
+    """
+    inputs = [node.name for node in model.graph.input]
+    if inputs == [tree_input]:
+        dims = model.graph.input[0].type.tensor_type.shape.dim
+        n_features = dims[1].dim_value if len(dims) == 2 else 0
+        if n_features <= 0:
+            raise ValueError("The model input must have a fixed number of features.")
+        return list(range(n_features)), n_features
+
+    concat = next(
+        (
+            node
+            for node in model.graph.node
+            if node.op_type == "Concat" and node.output[0] == tree_input
+        ),
+        None,
+    )
+    if (
+        concat is None
+        or _attributes(concat).get("axis") not in (1, -1)
+        or not set(concat.input) <= set(inputs)
+    ):
+        raise ValueError("The tree ensemble must be fed by the model inputs.")
+
+    return [inputs.index(name) for name in concat.input], len(inputs)
+
+
+def export_tree_ensemble(  # pylint: disable=too-many-locals
+    model: onnx.ModelProto,
+) -> Dict[str, Any]:
+    """
+    Extract the arrays describing the model's ``TreeEnsembleClassifier``.
+
+    Nodes of all trees are stored in flat arrays. Leaves have a child
+    index of -1, and ``leaf_weights`` holds the score each leaf adds to
+    every class. Feature ids refer to the columns of the model inputs.
+
+    :param model: An ONNX model containing a TreeEnsembleClassifier node.
+
+    :return: The arrays describing the trees, keyed by name, and the number
+        of input features.
+    """
+    node = next(
+        (n for n in model.graph.node if n.op_type == "TreeEnsembleClassifier"), None
+    )
+    if node is None:
+        raise ValueError("Model has no TreeEnsembleClassifier node.")
+
+    attrs = _attributes(node)
+    missing = [name for name in _REQUIRED_ATTRIBUTES if name not in attrs]
+    if missing:
+        raise ValueError(f"Unsupported tree ensemble encoding, missing {missing}.")
+    if attrs.get("post_transform", b"NONE") != b"NONE":
+        raise ValueError(f"Unsupported post_transform {attrs['post_transform']!r}.")
+    if attrs.get("base_values"):
+        raise ValueError("Models with base_values are not supported.")
+    if any(attrs.get("nodes_missing_value_tracks_true", [])):
+        raise ValueError("Models with missing value tracking are not supported.")
+
+    modes = [mode.decode() for mode in attrs["nodes_modes"]]
+    unsupported = set(modes) - {"BRANCH_LEQ", "LEAF"}
+    if unsupported:
+        raise ValueError(f"Unsupported node modes: {sorted(unsupported)}.")
+
+    columns, n_features = _feature_columns(model, node.input[0])
+
+    # Global index of every (tree id, node id) pair
+    index = {
+        (tree_id, node_id): i
+        for i, (tree_id, node_id) in enumerate(
+            zip(attrs["nodes_treeids"], attrs["nodes_nodeids"])
+        )
+    }
+    n_nodes = len(index)
+
+    true_children = np.full(n_nodes, -1, dtype=np.int32)
+    false_children = np.full(n_nodes, -1, dtype=np.int32)
+    for i, (tree_id, mode) in enumerate(zip(attrs["nodes_treeids"], modes)):
+        if mode == "BRANCH_LEQ":
+            true_children[i] = index[(tree_id, attrs["nodes_truenodeids"][i])]
+            false_children[i] = index[(tree_id, attrs["nodes_falsenodeids"][i])]
+
+    classes = np.array([label.decode() for label in attrs["classlabels_strings"]])
+    if len(classes) == 2 and len(set(attrs["class_ids"])) == 1:
+        # ONNX Runtime thresholds the score of the only weighted class instead
+        # of comparing the scores of both classes.
+        raise ValueError("Binary models weighting a single class are not supported.")
+    leaf_weights = np.zeros((n_nodes, len(classes)), dtype=np.float32)
+    for tree_id, node_id, class_id, weight in zip(
+        attrs["class_treeids"],
+        attrs["class_nodeids"],
+        attrs["class_ids"],
+        attrs["class_weights"],
+    ):
+        leaf_weights[index[(tree_id, node_id)], class_id] += weight
+
+    tree_ids = list(dict.fromkeys(attrs["nodes_treeids"]))
+    return {
+        "roots": np.array([index[(tree_id, 0)] for tree_id in tree_ids], np.int32),
+        "feature_ids": np.array(
+            [columns[feature_id] for feature_id in attrs["nodes_featureids"]],
+            dtype=np.int32,
+        ),
+        "thresholds": np.array(attrs["nodes_values"], dtype=np.float32),
+        "true_children": true_children,
+        "false_children": false_children,
+        "leaf_weights": leaf_weights,
+        "classes": classes,
+        "n_features": n_features,
+    }
+
+
+def _predict_classes(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    features: np.ndarray,
+    roots: np.ndarray,
+    feature_ids: np.ndarray,
+    thresholds: np.ndarray,
+    true_children: np.ndarray,
+    false_children: np.ndarray,
+    leaf_weights: np.ndarray,
+) -> np.ndarray:
+    """
+    Return the index of the predicted class of every row of ``features``.
+
+    Each tree is walked from its root until a leaf is reached, and the
+    leaf weights are summed per class in tree order, like ONNX Runtime
+    does. The class with the highest score wins, the first one on ties.
+    """
+    n_rows = features.shape[0]
+    n_classes = leaf_weights.shape[1]
+    predictions = np.empty(n_rows, dtype=np.int64)
+    scores = np.empty(n_classes, dtype=np.float32)
+
+    for row in range(n_rows):
+        scores[:] = 0
+        for root in roots:
+            node = root
+            while true_children[node] >= 0:
+                if features[row, feature_ids[node]] <= thresholds[node]:
+                    node = true_children[node]
+                else:
+                    node = false_children[node]
+            for k in range(n_classes):
+                scores[k] += leaf_weights[node, k]
+
+        best = 0
+        for k in range(1, n_classes):
+            if scores[k] > scores[best]:
+                best = k
+        predictions[row] = best
+
+    return predictions
+
+
+# fastmath is left off on purpose: reordering the sums could flip ties
+# between classes and make predictions differ from ONNX Runtime.
+_predict: Callable[..., np.ndarray] = (
+    njit(cache=True, nogil=True)(_predict_classes)
+    if NUMBA_AVAILABLE
+    else _predict_classes
+)
+
+
+class TreeEnsemble:
+    """
+    Tree ensemble classifier evaluated without ONNX Runtime.
+
+    Small forests are cheaper to walk directly than to dispatch through an
+    inference session. The trees are read from the served ONNX model, and
+    the walk is compiled with numba when it is installed.
+    """
+
+    def __init__(self, arrays: Dict[str, Any]) -> None:
+        """
+        :param arrays: The arrays returned by export_tree_ensemble.
+        """
+        self.classes = np.asarray(arrays["classes"])
+        self.n_features = int(arrays["n_features"])
+        self._trees = (
+            np.ascontiguousarray(arrays["roots"], dtype=np.int32),
+            np.ascontiguousarray(arrays["feature_ids"], dtype=np.int32),
+            np.ascontiguousarray(arrays["thresholds"], dtype=np.float32),
+            np.ascontiguousarray(arrays["true_children"], dtype=np.int32),
+            np.ascontiguousarray(arrays["false_children"], dtype=np.int32),
+            np.ascontiguousarray(arrays["leaf_weights"], dtype=np.float32),
+        )
+
+    @classmethod
+    def from_onnx(cls, path: str) -> "TreeEnsemble":
+        """
+        Load the tree ensemble of an ONNX model.
+
+        :param path: The path of the ONNX model.
+
+        :return: The loaded tree ensemble.
+        """
+        return cls(export_tree_ensemble(onnx.load(path)))
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """
+        Predict the class label of every row.
+
+        :param features: A (n, n_features) array with one row per sample.
+
+        :return: The predicted label of every row.
+        """
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim != 2 or features.shape[1] != self.n_features:
+            raise ValueError(
+                f"Expected input of shape (n, {self.n_features}), "
+                f"got {features.shape}"
+            )
+
+        return self.classes[_predict(features, *self._trees)]
@@ -0,0 +1,58 @@
+"""
+JSON provider backed by orjson for faster request and response handling.
+
+NumPy arrays with a numeric dtype are serialized directly from their
+buffer, without converting them to Python lists first.
+"""
+
+from typing import Any, Union
+
+import orjson
+from flask import Response
+from flask.json.provider import JSONProvider
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> str:
+    """Fallback serializer for types orjson does not support natively."""
+    return str(obj)
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider that encodes and decodes with orjson."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """
+        Serialize data as a JSON string.
+
+        :param obj: The data to serialize.
+
+        :return: The JSON encoded string.
+        """
+        return orjson.dumps(obj, default=_default, option=_OPTIONS).decode()
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        """
+        Deserialize data from a JSON string or bytes.
+
+        :param s: The JSON text to parse.
+
+        :return: The decoded Python object.
+        """
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """
+        Serialize the given arguments as JSON and return a response.
+
+        Bytes produced by orjson are passed straight to the response,
+        avoiding an intermediate ``str`` round trip.
+
+        :return: A response object with the ``application/json`` mimetype.
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        return Response(
+            orjson.dumps(obj, default=_default, option=_OPTIONS),
+            mimetype="application/json",
+        )
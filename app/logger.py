@@ -1,6 +1,8 @@
 """Module to provide a custom logging setup"""
 
 import logging
+import os
+from typing import Any
 
 # https://en.wikipedia.org/wiki/ANSI_escape_code#Colors
 END: str = "\33[0m"
@@ -10,6 +12,9 @@ GREEN: str = "\33[32m"
 YELLOW: str = "\33[33m"
 BLUE: str = "\33[94m"
 
+# Minimum level of the messages emitted, e.g. DEBUG to trace every request.
+LOG_LEVEL: str = os.environ.get("LOG_LEVEL", "INFO").upper()
+
 
 class ColoredFormatter(logging.Formatter):
     """Formats log messages with color based on severity level."""
@@ -23,20 +28,35 @@ class ColoredFormatter(logging.Formatter):
         logging.DEBUG: BLUE,
     }
 
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the formatter and build the colored level names once."""
+        super().__init__(*args, **kwargs)
+        self._colored_levelnames = {
+            level: f"{color}{logging.getLevelName(level)}{END}"
+            for level, color in self.LOG_LEVEL_COLOR.items()
+        }
+
     def format(self, record: logging.LogRecord) -> str:
         """
         Format the log record with color based on log level.
 
+        The record's level name is only colored while it is formatted,
+        so other handlers receive the record unchanged.
+
         :param record: The log record to format.
 
         :return: Formatted log message.
         """
-        color = ColoredFormatter.LOG_LEVEL_COLOR.get(record.levelno, None)
+        levelname = self._colored_levelnames.get(record.levelno)
 
-        if color:
-            record.levelname = f"{color}{record.levelname}{END}"
+        if levelname is None:
+            return super().format(record)
 
-        return super().format(record)
+        original_levelname, record.levelname = record.levelname, levelname
+        try:
+            return super().format(record)
+        finally:
+            record.levelname = original_levelname
 
 
 def setup_logger(name: str) -> logging.Logger:
@@ -45,12 +65,19 @@ def setup_logger(name: str) -> logging.Logger:
 
     This function creates a logger with a specified name and adds
     a console handler with a colored output format. The logger
-    is configured to display messages of level DEBUG and above.
+    is configured to display messages of level LOG_LEVEL (INFO by
+    default) and above.
+    Calling it again with the same name returns the same logger
+    without adding another handler.
 
     :param name: The name of the logger to be created.
 
     :return: The configured logger instance.
     """
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+
     # Create handle
     console_handler = logging.StreamHandler()
 
@@ -60,8 +87,7 @@ def setup_logger(name: str) -> logging.Logger:
     # Apply formatter to handle
     console_handler.setFormatter(formatter)
 
-    logger = logging.getLogger(name)
     logger.addHandler(console_handler)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(LOG_LEVEL)
 
     return logger
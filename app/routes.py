@@ -2,27 +2,267 @@
 
 # pylint: disable=broad-exception-caught
 
-from typing import Any, Dict, Optional, Tuple
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
 
 import numpy as np
 import onnxruntime  # type: ignore
-from flask import Blueprint, Flask, Response, jsonify, request
+import orjson
+from flask import Blueprint, Response, jsonify, request
 from pydantic import ValidationError
 
 from app.logger import setup_logger
 
+from .batching import DynamicBatcher
+from .inference import NUMBA_AVAILABLE, TreeEnsemble
 from .schemas import PredictInput
 
-app = Flask(__name__)
-
 bp = Blueprint("api", __name__)
 
-# Load the ONNX model globally
-MODEL_PATH = "models/model.onnx"
-ort_session = onnxruntime.InferenceSession(MODEL_PATH)
-
 LOG = setup_logger("ta-ml-model-api")
 
+# ONNX model served by the API. MODEL_PATH can point the service at an
+# alternative (e.g. quantized or optimized) export of the same model.
+# The default model takes the four features as a single fused tensor,
+# see scripts/fuse_model_inputs.py.
+MODEL_PATH = os.environ.get("MODEL_PATH", "models/model.fused.onnx")
+# When set, ONNX Runtime serializes the optimized graph to this path so it
+# can be loaded directly (via MODEL_PATH) on subsequent starts.
+OPTIMIZED_MODEL_PATH = os.environ.get("OPTIMIZED_MODEL_PATH")
+ORT_INTRA_OP_THREADS = int(os.environ.get("ORT_INTRA_OP_THREADS", os.cpu_count() or 1))
+# Comma separated ONNX Runtime execution providers, by order of preference.
+# Providers missing from the installed onnxruntime build are skipped.
+ORT_PROVIDERS = os.environ.get("ORT_PROVIDERS", "CPUExecutionProvider")
+TRT_ENGINE_CACHE_PATH = os.environ.get("TRT_ENGINE_CACHE_PATH", "/tmp/trt_cache")
+# Dynamic batching of concurrent requests, enabled when BATCH_MAX_SIZE > 1.
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 1))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 2.0))
+# How long a request waits for its batch: the batching window plus a margin
+# for running the batch (and any batch queued ahead of it).
+BATCH_TIMEOUT_MS = float(os.environ.get("BATCH_TIMEOUT_MS", BATCH_MAX_WAIT_MS + 1000.0))
+# "native" walks the trees of the MODEL_PATH model directly (see
+# app/inference.py) instead of running them through ONNX Runtime ("onnx").
+INFERENCE_BACKEND = os.environ.get(
+    "INFERENCE_BACKEND", "native" if NUMBA_AVAILABLE else "onnx"
+)
+
+# Compiled validator of the request schema, called directly to skip the
+# model_validate wrapper on every request. pydantic-core validates a request
+# faster than equivalent hand-written checks in Python would, so it is kept
+# on the hot path.
+_PREDICT_INPUT_VALIDATOR = PredictInput.__pydantic_validator__
+
+
+def create_session_options() -> onnxruntime.SessionOptions:
+    """
+    Build the ONNX Runtime session options used to load the model.
+
+    Enables all graph optimizations and sequential execution, which keeps
+    latency low for single, small requests. The model's intermediate
+    tensors are tiny, so the CPU memory arena is disabled: it costs more
+    bookkeeping (and resident memory) than it saves in allocations.
+
+    :return: The configured session options.
+    """
+    sess_options = onnxruntime.SessionOptions()
+    sess_options.graph_optimization_level = (
+        onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    sess_options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    sess_options.intra_op_num_threads = ORT_INTRA_OP_THREADS
+    sess_options.enable_mem_pattern = True
+    sess_options.enable_cpu_mem_arena = False
+    if OPTIMIZED_MODEL_PATH:
+        sess_options.optimized_model_filepath = OPTIMIZED_MODEL_PATH
+
+    return sess_options
+
+
+def get_providers() -> List[Union[str, Tuple[str, Dict[str, Any]]]]:
+    """
+    Build the list of execution providers used to load the model.
+
+    Providers from ORT_PROVIDERS that are not available are skipped, and
+    the CPU provider is always kept as the last fallback. TensorRT caches
+    its built engines so they are not rebuilt on every start.
+
+    :return: The providers, optionally with their options, by preference.
+    """
+    available = onnxruntime.get_available_providers()
+    providers: List[Union[str, Tuple[str, Dict[str, Any]]]] = []
+
+    for name in (provider.strip() for provider in ORT_PROVIDERS.split(",")):
+        if name == "CPUExecutionProvider":
+            continue
+        if name not in available:
+            LOG.warning("Execution provider %s is not available, skipping.", name)
+        elif name == "TensorrtExecutionProvider":
+            providers.append(
+                (
+                    name,
+                    {
+                        "trt_fp16_enable": True,
+                        "trt_engine_cache_enable": True,
+                        "trt_engine_cache_path": TRT_ENGINE_CACHE_PATH,
+                    },
+                )
+            )
+        else:
+            providers.append(name)
+
+    providers.append("CPUExecutionProvider")
+    return providers
+
+
+# NumPy dtype matching the model's declared input element type, so reduced
+# precision exports (e.g. float16) can be served without code changes.
+_ORT_TENSOR_DTYPES = {
+    "tensor(float16)": np.float16,
+    "tensor(float)": np.float32,
+    "tensor(double)": np.float64,
+}
+
+
+class ModelIO(NamedTuple):
+    """
+    Model input/output details, resolved once instead of crossing into ORT
+    for every request. Only the predicted label output is fetched.
+    """
+
+    input_names: Tuple[str, ...]
+    output_names: Tuple[str, ...]
+    input_dtype: Any
+    # Models either take one (batch, 1) input per feature or a single fused
+    # (batch, n_features) input.
+    n_features: int
+
+
+# The session is loaded on first use (or by the gunicorn post_fork hook, see
+# gunicorn.conf.py) rather than at import, so every worker process builds
+# its own session after forking.
+# pylint: disable=invalid-name
+_ort_session: Optional[onnxruntime.InferenceSession] = None
+_model_io: Optional[ModelIO] = None
+# pylint: enable=invalid-name
+_session_lock = threading.Lock()
+
+
+def _get_session() -> onnxruntime.InferenceSession:
+    """
+    Return the ONNX Runtime session, loading the model on first call.
+
+    :return: The inference session of the current process.
+    """
+    global _ort_session, _model_io  # pylint: disable=global-statement
+
+    if _ort_session is None:
+        with _session_lock:
+            if _ort_session is None:
+                session = onnxruntime.InferenceSession(
+                    MODEL_PATH,
+                    sess_options=create_session_options(),
+                    providers=get_providers(),
+                )
+                # Fail loudly instead of silently retrying on the CPU provider only
+                session.disable_fallback()
+
+                inputs = session.get_inputs()
+                input_names = tuple(node.name for node in inputs)
+                _model_io = ModelIO(
+                    input_names=input_names,
+                    output_names=(session.get_outputs()[0].name,),
+                    input_dtype=_ORT_TENSOR_DTYPES[inputs[0].type],
+                    n_features=(
+                        inputs[0].shape[1]
+                        if len(input_names) == 1
+                        else len(input_names)
+                    ),
+                )
+                _ort_session = session
+                LOG.info("Loaded model %s.", MODEL_PATH)
+
+    return _ort_session
+
+
+def get_model_io() -> ModelIO:
+    """
+    Return the input/output details of the model, loading it if needed.
+
+    :return: The model's input/output details.
+    """
+    _get_session()
+    assert _model_io is not None
+    return _model_io
+
+
+def _load_tree_ensemble() -> Optional[TreeEnsemble]:
+    """
+    Load the tree ensemble of the model when the native backend is used.
+
+    The native backend is only picked by default when numba is installed,
+    so a model it cannot evaluate falls back to ONNX Runtime, unless the
+    native backend was explicitly requested.
+
+    :return: The model's tree ensemble, or None to use ONNX Runtime.
+    """
+    if INFERENCE_BACKEND != "native":
+        return None
+
+    try:
+        tree_ensemble = TreeEnsemble.from_onnx(MODEL_PATH)
+    except ValueError as e:
+        if "INFERENCE_BACKEND" in os.environ:
+            raise
+        LOG.warning(
+            "Model %s cannot be evaluated natively (%s), using ONNX Runtime.",
+            MODEL_PATH,
+            str(e),
+        )
+        return None
+
+    LOG.info("Loaded tree ensemble of model %s.", MODEL_PATH)
+    return tree_ensemble
+
+
+TREE_ENSEMBLE = _load_tree_ensemble()
+
+
+def run_batch(batch: np.ndarray) -> np.ndarray:
+    """
+    Run the model on a batch of requests.
+
+    :param batch: A (n, n_features) array with one row per request.
+
+    :return: The predicted label of every row.
+    """
+    if TREE_ENSEMBLE is not None:
+        return TREE_ENSEMBLE.predict(batch)
+
+    model_io = get_model_io()
+    if len(model_io.input_names) == 1:
+        ort_inputs = {model_io.input_names[0]: batch}
+    else:
+        ort_inputs = {
+            name: np.ascontiguousarray(batch[:, i : i + 1])
+            for i, name in enumerate(model_io.input_names)
+        }
+
+    return _get_session().run(model_io.output_names, ort_inputs)[0]
+
+
+BATCHER = (
+    DynamicBatcher(run_batch, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS)
+    if BATCH_MAX_SIZE > 1
+    else None
+)
+
+# IO bindings are not thread safe, so each worker thread keeps its own
+# binding together with the input buffer bound to it, or a plain input
+# buffer when no binding is needed.
+_thread_local = threading.local()
+
 
 def init_routes(application):
     """Initialize routes for the application."""
@@ -61,7 +301,18 @@ def predict() -> Tuple[Response, int]:
         A JSON response with either the prediction and confidence scores or
         an error message if no data is provided.
     """
-    validate_data = validate_input(json_data=request.get_json())
+    payload = request.get_data(cache=False)
+    if not payload:
+        LOG.error("No data provided.")
+        return jsonify({"error": "No data provided"}), 400
+
+    try:
+        json_data = orjson.loads(payload)
+    except orjson.JSONDecodeError as e:
+        LOG.error("Invalid JSON payload: %s", str(e))
+        return jsonify({"error": "Invalid JSON payload."}), 400
+
+    validate_data = validate_input(json_data=json_data)
     if isinstance(validate_data, dict) and "error" in validate_data:
         LOG.error("Validation failed: %s", validate_data["error"])
         return jsonify(validate_data), 400
@@ -75,13 +326,13 @@ def predict() -> Tuple[Response, int]:
     prediction, status_code = run_inference(input_data=input_data)
 
     if status_code == 200:
-        LOG.info("Model inference successful. Prediction: %s", prediction)
+        LOG.debug("Model inference successful. Prediction: %s", prediction)
+        response = {
+            "prediction": prediction,
+        }
     else:
         LOG.error("Model inference failed. Status code: %d", status_code)
-
-    response = {
-        "prediction": prediction,
-    }
+        response = prediction
 
     # Return predict
     return jsonify(response), status_code
@@ -98,9 +349,9 @@ def validate_input(json_data: Dict[str, Any]) -> Dict[str, Any]:
     :return: A dictionary containing the validated input data
             if valid, or an error dictionary if validation fails.
     """
-    LOG.info("Starting input validation: %s", json_data)
+    LOG.debug("Starting input validation: %s", json_data)
     try:
-        return PredictInput(**json_data)
+        return _PREDICT_INPUT_VALIDATOR.validate_python(json_data)
     except ValidationError as e:
         LOG.error("Validation error: %s", e.errors())
         return {"error": e.errors()}
@@ -114,8 +365,8 @@ def prepare_input_data(data: Dict[str, Any]) -> Optional[np.ndarray]:
     Prepare input data for model inference.
 
     This function extracts the required input parameters from the
-    provided data dictionary and converts them into a NumPy array
-    suitable for model inference.
+    provided data dictionary and writes them into the input buffer
+    of the current thread.
 
     :param data: A dictionary containing the required input parameters for the model, including:
         - Material_A_Charged_Amount
@@ -124,24 +375,22 @@ def prepare_input_data(data: Dict[str, Any]) -> Optional[np.ndarray]:
         - Material_A_Final_Concentration_Previous_Batch
 
     :return:A 2D NumPy array prepared for model inference if successful,
-        or None if there was an error during preparation.
+        or None if there was an error during preparation. The array is
+        reused by the next call made from the same thread.
     """
-    inputs = [
-        data.Material_A_Charged_Amount,
-        data.Material_B_Charged_Amount,
-        data.Reactor_Volume,
-        data.Material_A_Final_Concentration_Previous_Batch,
-    ]
+    LOG.debug("Preparing input data for model inference: %s", data)
 
-    LOG.info("Preparing input data for model inference: %s", data)
+    prepared_data = get_input_buffer()
 
     try:
-        LOG.debug("Processing inputs: %s", inputs)
+        # Write input data straight into the buffer used by the model. For
+        # four values, scalar stores beat building or assigning a new array.
+        prepared_data[0, 0] = data.Material_A_Charged_Amount[0][0]
+        prepared_data[1, 0] = data.Material_B_Charged_Amount[0][0]
+        prepared_data[2, 0] = data.Reactor_Volume[0][0]
+        prepared_data[3, 0] = data.Material_A_Final_Concentration_Previous_Batch[0][0]
 
-        # Prepare input data to be used by the model
-        prepared_data = np.array([[item[0][0]] for item in inputs], dtype=np.float32)
-
-        LOG.info("Input data prepared successfully: %s", prepared_data)
+        LOG.debug("Input data prepared successfully: %s", prepared_data)
 
         return prepared_data
     except Exception as e:
@@ -149,42 +398,131 @@ def prepare_input_data(data: Dict[str, Any]) -> Optional[np.ndarray]:
         return None
 
 
-def run_inference(input_data: Any) -> Tuple[list, int]:
+def get_input_buffer() -> np.ndarray:
     """
-    Run inference using the ONNX model.
+    Return the input buffer of the current thread.
 
-    This function takes input data, prepares it for the ONNX model,
-    and runs the inference. It returns the model's output and the
-    corresponding HTTP status code.
+    The native backend and batched requests do not run the model through an
+    IO binding, so they get a plain preallocated buffer, and the ONNX Runtime
+    session is not needed to create it. Otherwise the buffer bound to the
+    model by get_io_binding is returned.
+
+    :return: The (n_features, 1) input buffer.
+    """
+    if TREE_ENSEMBLE is None and BATCHER is None:
+        return get_io_binding()[1]
+
+    input_buffer = getattr(_thread_local, "plain_buffer", None)
+    if input_buffer is None:
+        if TREE_ENSEMBLE is not None:
+            input_buffer = np.empty((TREE_ENSEMBLE.n_features, 1), dtype=np.float32)
+        else:
+            model_io = get_model_io()
+            input_buffer = np.empty(
+                (model_io.n_features, 1), dtype=model_io.input_dtype
+            )
+        _thread_local.plain_buffer = input_buffer
+
+    return input_buffer
+
+
+def get_io_binding() -> Tuple[onnxruntime.IOBinding, np.ndarray]:
+    """
+    Return the IO binding and bound input buffer of the current thread.
+
+    The binding is created on first use: the model inputs are bound to a
+    preallocated buffer, so inference only needs to write the input values
+    into that buffer instead of allocating new tensors.
+
+    :return: A tuple with the IO binding and its (n_features, 1) input buffer.
+    """
+    io_binding = getattr(_thread_local, "io_binding", None)
+    if io_binding is None:
+        model_io = get_model_io()
+        input_buffer = np.empty((model_io.n_features, 1), dtype=model_io.input_dtype)
+
+        io_binding = _get_session().io_binding()
+        if len(model_io.input_names) == 1:
+            # Fused model: the whole buffer is seen as one (1, n_features) row
+            io_binding.bind_cpu_input(
+                model_io.input_names[0], input_buffer.reshape(1, -1)
+            )
+        else:
+            for i, name in enumerate(model_io.input_names):
+                io_binding.bind_cpu_input(name, input_buffer[i : i + 1])
+        for name in model_io.output_names:
+            io_binding.bind_output(name, "cpu")
+
+        _thread_local.io_binding = io_binding
+        _thread_local.input_buffer = input_buffer
+
+    return io_binding, _thread_local.input_buffer
+
+
+def run_inference(input_data: Any) -> Tuple[Any, int]:
+    """
+    Run the model on the input data.
+
+    The input is copied into the input buffer of the current thread, unless
+    it already is that buffer. It is then submitted to the dynamic batcher
+    when batching is enabled, or evaluated right away: by walking the
+    model's tree ensemble natively, or by running the ONNX Runtime session
+    through the thread's IO binding.
 
     :param input_data: The input data to be used for inference,
-        expected to be a NumPy array or a structure compatible
-        with the ONNX model.
+        expected to be a NumPy array of shape (n_features, 1).
 
     :return: A tuple containing the model's prediction as a
-        list and the HTTP status code. The status code is 200 for
-        successful inference and 400 for errors.
+        list (or an error dictionary) and the HTTP status code. The
+        status code is 200 for successful inference, 400 for errors and
+        503 when a batched inference times out.
     """
 
-    LOG.info("Starting model inference with input data: %s", input_data)
+    LOG.debug("Starting model inference with input data: %s", input_data)
 
     try:
-        ort_inputs = {
-            ort_session.get_inputs()[i].name: input_data[i : i + 1]
-            for i in range(len(input_data))
-        }
-
-        LOG.debug("Prepared ONNX model inputs: %s", ort_inputs)
-        output = ort_session.run(None, ort_inputs)
-
-        return output[0].tolist(), 200  # Return prediction and no error
+        input_buffer = get_input_buffer()
+        if input_data is not input_buffer:
+            if np.shape(input_data) != input_buffer.shape:
+                raise ValueError(
+                    f"Expected input of shape {input_buffer.shape}, "
+                    f"got {np.shape(input_data)}"
+                )
+            input_buffer[...] = input_data
+
+        if BATCHER is not None:
+            future = BATCHER.submit(input_buffer)
+            try:
+                return [future.result(timeout=BATCH_TIMEOUT_MS / 1000)], 200
+            except FutureTimeoutError:
+                # Drop the request from the queue if it has not started yet
+                future.cancel()
+                LOG.error("Batched inference timed out.")
+                return {"error": "Model inference timed out."}, 503
+
+        if TREE_ENSEMBLE is not None:
+            return TREE_ENSEMBLE.predict(input_buffer.reshape(1, -1)).tolist(), 200
+
+        io_binding, _ = get_io_binding()
+        _get_session().run_with_iobinding(io_binding)
+        output = io_binding.get_outputs()[0].numpy()
+
+        return output.tolist(), 200  # Return prediction and no error
     except Exception as e:
         LOG.error("Error during model inference: %s", str(e))
-        return (
-            jsonify({"error": "Invalid input for the ONNX model", "details": str(e)}),
-            400,
-        )
+        return {"error": "Invalid input for the ONNX model", "details": str(e)}, 400
+
 
+def warm_up() -> None:
+    """
+    Run one dummy prediction through the configured backend.
+
+    This loads the ONNX Runtime session, or compiles the native tree
+    ensemble, so the first request does not have to wait for it.
+    """
+    input_buffer = get_input_buffer()
+    input_buffer[...] = 0
 
-if __name__ == "__main__":
-    app.run(debug=True)
+    response, status_code = run_inference(input_buffer)
+    if status_code != 200:
+        raise RuntimeError(f"Warm-up prediction failed: {response}")
@@ -0,0 +1,27 @@
+"""
+Gunicorn configuration for serving the Flask application.
+
+Usage: gunicorn run:app
+"""
+
+# pylint: disable=invalid-name
+
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 2))
+
+# Every worker loads its own ONNX Runtime session. Default each one to a
+# single intra-op thread so the workers together don't oversubscribe the CPU.
+os.environ.setdefault("ORT_INTRA_OP_THREADS", "1")
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    """Warm up the model of every worker right after it is forked."""
+    # pylint: disable-next=import-outside-toplevel
+    from app.routes import warm_up
+
+    warm_up()
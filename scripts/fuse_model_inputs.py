@@ -0,0 +1,84 @@
+"""
+Fuse the per-feature inputs of an ONNX model into a single input tensor.
+
+Models exported by skl2onnx with one input per feature start with a
+``Concat(axis=1)`` node merging those inputs. This script removes that
+node and exposes its output as one ``(batch, n_features)`` graph input,
+so callers bind a single tensor instead of one tensor per feature.
+
+Usage:
+    python scripts/fuse_model_inputs.py models/model.onnx models/model.fused.onnx
+"""
+
+import argparse
+
+import onnx
+from onnx import helper
+
+FUSED_INPUT_NAME = "input_all"
+
+
+def fuse_inputs(model: onnx.ModelProto) -> onnx.ModelProto:
+    """
+    Replace the leading input ``Concat`` node by a single graph input.
+
+    :param model: The model whose graph inputs are concatenated on axis 1.
+
+    :return: The same model, modified in place, with a single input.
+    """
+    graph = model.graph
+    input_names = [graph_input.name for graph_input in graph.input]
+
+    concat = next(
+        (
+            node
+            for node in graph.node
+            if node.op_type == "Concat" and list(node.input) == input_names
+        ),
+        None,
+    )
+    if concat is None:
+        raise ValueError("Model has no Concat node consuming all graph inputs.")
+
+    axis = next(
+        (helper.get_attribute_value(a) for a in concat.attribute if a.name == "axis"),
+        None,
+    )
+    if axis != 1:
+        raise ValueError(
+            f"Expected the inputs to be concatenated on axis 1, got {axis}."
+        )
+
+    first_input = graph.input[0].type.tensor_type
+    fused_input = helper.make_tensor_value_info(
+        FUSED_INPUT_NAME, first_input.elem_type, [None, len(input_names)]
+    )
+
+    merged_name = concat.output[0]
+    graph.node.remove(concat)
+    for node in graph.node:
+        for i, name in enumerate(node.input):
+            if name == merged_name:
+                node.input[i] = FUSED_INPUT_NAME
+
+    del graph.input[:]
+    graph.input.append(fused_input)
+
+    onnx.checker.check_model(model)
+    return model
+
+
+def main() -> None:
+    """Parse the command line and write the fused model."""
+    parser = argparse.ArgumentParser(
+        description="Fuse the per-feature inputs of an ONNX model."
+    )
+    parser.add_argument("source", help="Path of the model to fuse.")
+    parser.add_argument("target", help="Path where the fused model is saved.")
+    args = parser.parse_args()
+
+    onnx.save(fuse_inputs(onnx.load(args.source)), args.target)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,40 @@
-# pylint: disable=redefined-outer-name
+# pylint: disable=protected-access
 """
 Tests for the predict route in the Flask application.
 """
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional, Type
+
 import numpy as np
+import onnx
+import onnxruntime  # type: ignore
+import orjson
 import pytest
 from flask.testing import FlaskClient
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 import app.routes
 from app import create_app
-
-
-@pytest.fixture
-def client():
-    """Create a test client for the Flask application."""
-    app = create_app()
-    app.config["TESTING"] = True
-    with app.test_client() as client:
-        yield client
+from app.batching import DynamicBatcher
+from app.inference import TreeEnsemble
+from app.schemas import PredictInput
+
+# Valid /predict payload, shared by the tests. It must not be modified.
+_VALID_PAYLOAD = {
+    "Material_A_Charged_Amount": [[10]],
+    "Material_B_Charged_Amount": [[20]],
+    "Reactor_Volume": [[30]],
+    "Material_A_Final_Concentration_Previous_Batch": [[40]],
+}
+# _VALID_PAYLOAD serialized once, posted as the raw request body
+_VALID_JSON = orjson.dumps(_VALID_PAYLOAD)
+
+# Input prepared from _VALID_PAYLOAD
+_EXPECTED_PREPARED = np.asarray([[10.0], [20.0], [30.0], [40.0]], dtype=np.float32)
+_EXPECTED_PREPARED.setflags(write=False)
+_EXPECTED_BYTES = _EXPECTED_PREPARED.tobytes()
 
 
 class MockData(BaseModel):
@@ -32,12 +49,15 @@ class MockData(BaseModel):
             Final concentration of Material A from the previous batch.
     """
 
-    Material_A_Charged_Amount: list
-    Material_B_Charged_Amount: list
-    Reactor_Volume: list
-    Material_A_Final_Concentration_Previous_Batch: list
+    model_config = ConfigDict(frozen=True)
 
+    Material_A_Charged_Amount: list[list[float]]
+    Material_B_Charged_Amount: list[list[float]]
+    Reactor_Volume: list[list[float]]
+    Material_A_Final_Concentration_Previous_Batch: list[list[float]]
 
+
+@pytest.mark.slow
 def test_predict_success(client: FlaskClient) -> None:
     """
     Test the /predict endpoint with valid input data.
@@ -46,19 +66,15 @@ def test_predict_success(client: FlaskClient) -> None:
         - The response status code is 200.
         - The response contains a 'prediction' field.
     """
-    valid_data = {
-        "Material_A_Charged_Amount": [[10]],
-        "Material_B_Charged_Amount": [[20]],
-        "Reactor_Volume": [[30]],
-        "Material_A_Final_Concentration_Previous_Batch": [[40]],
-    }
-
-    response = client.post("/predict", json=valid_data)
+    response = client.post(
+        "/predict", data=_VALID_JSON, content_type="application/json"
+    )
     assert response.status_code == 200
-    json_data = response.get_json()
-    assert "prediction" in json_data
+    body = orjson.loads(response.data)
+    assert "prediction" in body
 
 
+@pytest.mark.fast
 def test_predict_failed(client: FlaskClient) -> None:
     """
     Test the /predict endpoint with valid input data.
@@ -74,10 +90,39 @@ def test_predict_failed(client: FlaskClient) -> None:
         "Material_A_Final_Concentration_Previous_Batch": [[40]],
     }
 
-    response = client.post("/predict", json=valid_data)
+    response = client.post(
+        "/predict", data=orjson.dumps(valid_data), content_type="application/json"
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.fast
+def test_predict_no_data(client: FlaskClient) -> None:
+    """
+    Test the /predict endpoint when the request body is empty.
+
+    Sends a POST request without a body and checks that:
+        - The response status code is 400.
+        - The response contains a 'No data provided' error.
+    """
+    response = client.post("/predict", content_type="application/json")
+    assert response.status_code == 400
+    assert response.data == b'{"error":"No data provided"}'
+
+
+@pytest.mark.fast
+def test_predict_invalid_json(client: FlaskClient) -> None:
+    """
+    Test the /predict endpoint with a malformed JSON body.
+
+    Sends a POST request with invalid JSON and checks that the
+    response status code is 400.
+    """
+    response = client.post("/predict", data=b"{", content_type="application/json")
     assert response.status_code == 400
 
 
+@pytest.mark.fast
 def test_validate_input_no_data() -> None:
     """
     Test the /predict endpoint when no data is provided.
@@ -124,72 +169,60 @@ def test_validate_input_no_data() -> None:
     assert response == expected_errors
 
 
-@pytest.mark.parametrize(
-    "incomplete_data,field_missing",
-    [
-        (
-            {
-                "Material_B_Charged_Amount": [[20]],
-                "Reactor_Volume": [[30]],
-                "Material_A_Final_Concentration_Previous_Batch": [[40]],
-            },
-            "Material_A_Charged_Amount",
-        ),
-        (
-            {
-                "Material_A_Charged_Amount": [[10]],
-                "Reactor_Volume": [[30]],
-                "Material_A_Final_Concentration_Previous_Batch": [[40]],
-            },
-            "Material_B_Charged_Amount",
-        ),
-        (
-            {
-                "Material_A_Charged_Amount": [[10]],
-                "Material_B_Charged_Amount": [[20]],
-                "Material_A_Final_Concentration_Previous_Batch": [[40]],
-            },
-            "Reactor_Volume",
-        ),
-        (
-            {
-                "Material_A_Charged_Amount": [[10]],
-                "Material_B_Charged_Amount": [[20]],
-                "Reactor_Volume": [[30]],
-            },
-            "Material_A_Final_Concentration_Previous_Batch",
-        ),
-    ],
-)
-def test_validate_input_missing_required_input(
-    incomplete_data: dict, field_missing: str
-) -> None:
+@pytest.mark.fast
+def test_validate_input_missing_required_input() -> None:
     """
-    Test the /predict endpoint for missing required input fields.
-
-    Uses parameterized inputs to send POST requests with incomplete data.
-    Asserts that the response status code is 400 and checks that the error message
-    correctly identifies the missing required field.
+    Test validate_input for each missing required input field.
 
-    Parameters:
-        incomplete_data: The JSON data to send in the request, missing one required field.
-        field_missing: The name of the field that is expected to be missing in the request.
+    Every case leaves out one required field, and the validation error
+    must identify exactly that field.
     """
-    response = app.routes.validate_input(incomplete_data)
-
-    expected_error = [
-        {
-            "type": "missing",
-            "loc": (field_missing,),
-            "msg": "Field required",
-            "input": incomplete_data,
-            "url": "https://errors.pydantic.dev/2.9/v/missing",
+    for field_missing in _VALID_PAYLOAD:
+        incomplete_data = {
+            field: value
+            for field, value in _VALID_PAYLOAD.items()
+            if field != field_missing
         }
-    ]
 
-    assert expected_error == response["error"]
+        response = app.routes.validate_input(incomplete_data)
 
+        expected_error = [
+            {
+                "type": "missing",
+                "loc": (field_missing,),
+                "msg": "Field required",
+                "input": incomplete_data,
+                "url": "https://errors.pydantic.dev/2.9/v/missing",
+            }
+        ]
+        assert expected_error == response["error"], f"Missing {field_missing}"
+
+
+@pytest.mark.fast
+def test_validate_input_reuses_compiled_validator(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that validate_input uses the validator compiled at import."""
+    monkeypatch.setattr(PredictInput, "__pydantic_validator__", None)
+
+    response = app.routes.validate_input(_VALID_PAYLOAD)
+
+    assert isinstance(response, PredictInput)
+    assert response.Reactor_Volume == [[30.0]]
+
+
+@pytest.mark.fast
+@pytest.mark.parametrize(
+    "json_data", [None, [1, 2, 3, 4], "data"], ids=["null", "array", "string"]
+)
+def test_validate_input_not_an_object(json_data: Any) -> None:
+    """Test validate_input with a payload that is not a JSON object."""
+    response = app.routes.validate_input(json_data)
 
+    assert response["error"][0]["type"] == "model_type"
+
+
+@pytest.mark.fast
 @pytest.mark.parametrize(
     "invalid_data,invalid_field",
     [
@@ -230,6 +263,7 @@ def test_validate_input_missing_required_input(
             ("Material_A_Final_Concentration_Previous_Batch",),
         ),
     ],
+    ids=["invalid_A", "invalid_B", "invalid_volume", "invalid_final"],
 )
 def test_validate_input_invalid_data(invalid_data: dict, invalid_field: str) -> None:
     """Test validate_input function with invalid data and check for the appropriate error."""
@@ -240,50 +274,52 @@ def test_validate_input_invalid_data(invalid_data: dict, invalid_field: str) ->
     assert response["error"][0]["loc"] == invalid_field
 
 
+@pytest.mark.slow
 @pytest.mark.parametrize(
     "input_data,has_empty_value,result",
     [
         (
-            MockData(
-                Material_A_Charged_Amount=[[]],
-                Material_B_Charged_Amount=[[20]],
-                Reactor_Volume=[[30]],
-                Material_A_Final_Concentration_Previous_Batch=[[40]],
-            ),
+            {
+                "Material_A_Charged_Amount": [[]],
+                "Material_B_Charged_Amount": [[20]],
+                "Reactor_Volume": [[30]],
+                "Material_A_Final_Concentration_Previous_Batch": [[40]],
+            },
             True,
             None,
         ),
         (
-            MockData(
-                Material_A_Charged_Amount=[[10]],
-                Material_B_Charged_Amount=[[]],
-                Reactor_Volume=[[30]],
-                Material_A_Final_Concentration_Previous_Batch=[[40]],
-            ),
+            {
+                "Material_A_Charged_Amount": [[10]],
+                "Material_B_Charged_Amount": [[]],
+                "Reactor_Volume": [[30]],
+                "Material_A_Final_Concentration_Previous_Batch": [[40]],
+            },
             True,
             None,
         ),
         (
-            MockData(
-                Material_A_Charged_Amount=[[10]],
-                Material_B_Charged_Amount=[[20]],
-                Reactor_Volume=[[]],
-                Material_A_Final_Concentration_Previous_Batch=[[40]],
-            ),
+            {
+                "Material_A_Charged_Amount": [[10]],
+                "Material_B_Charged_Amount": [[20]],
+                "Reactor_Volume": [[]],
+                "Material_A_Final_Concentration_Previous_Batch": [[40]],
+            },
             True,
             None,
         ),
         (
-            MockData(
-                Material_A_Charged_Amount=[[10]],
-                Material_B_Charged_Amount=[[20]],
-                Reactor_Volume=[[30]],
-                Material_A_Final_Concentration_Previous_Batch=[[]],
-            ),
+            {
+                "Material_A_Charged_Amount": [[10]],
+                "Material_B_Charged_Amount": [[20]],
+                "Reactor_Volume": [[30]],
+                "Material_A_Final_Concentration_Previous_Batch": [[]],
+            },
             True,
             None,
         ),
     ],
+    ids=["empty_A", "empty_B", "empty_volume", "empty_final"],
 )
 def test_prepare_input_data_empty_value(
     input_data: dict, has_empty_value: bool, result: str
@@ -299,12 +335,13 @@ def test_prepare_input_data_empty_value(
         incomplete_data: The JSON data to send in the request, missing one required field.
         field_missing: The name of the field that is expected to be missing in the request.
     """
-    response = app.routes.prepare_input_data(input_data)
+    response = app.routes.prepare_input_data(MockData(**input_data))
 
     if has_empty_value:
         assert response == result
 
 
+@pytest.mark.slow
 def test_prepare_input_valid_data() -> None:
     """
     Test prepare_input_data with valid MockData input.
@@ -318,9 +355,250 @@ def test_prepare_input_valid_data() -> None:
         Material_A_Final_Concentration_Previous_Batch=[[40]],
     )
 
-    expected_result = np.array([[10.0], [20.0], [30.0], [40.0]], dtype=np.float32)
     result = app.routes.prepare_input_data(input_data)
 
-    assert np.array_equal(
-        result, expected_result
-    ), f"Expected {expected_result} but got {result}"
+    # The values are exact in float32, so the buffers must match bit for bit
+    assert result.shape == _EXPECTED_PREPARED.shape
+    assert result.dtype == _EXPECTED_PREPARED.dtype
+    assert (
+        result.tobytes() == _EXPECTED_BYTES
+    ), f"Expected {_EXPECTED_PREPARED} but got {result}"
+
+
+@pytest.mark.slow
+def test_prepare_input_data_uses_bound_buffer() -> None:
+    """Test that prepare_input_data writes into the thread's bound input buffer."""
+    input_data = MockData(
+        Material_A_Charged_Amount=[[10]],
+        Material_B_Charged_Amount=[[20]],
+        Reactor_Volume=[[30]],
+        Material_A_Final_Concentration_Previous_Batch=[[40]],
+    )
+
+    result = app.routes.prepare_input_data(input_data)
+
+    assert result is app.routes.get_input_buffer()
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    "values",
+    [
+        [10.0, 20.0, 30.0, 40.0],
+        [30.0, 2000.0, 7000.0, 1.0],
+        [100.0, 3000.0, 6000.0, 50.0],
+    ],
+)
+def test_run_inference_matches_original_model(values: list) -> None:
+    """Test that run_inference returns the same label as the original ONNX model."""
+    original_session = onnxruntime.InferenceSession(
+        "models/model.onnx", providers=["CPUExecutionProvider"]
+    )
+    input_data = np.array(values, dtype=np.float32).reshape(-1, 1)
+    ort_inputs = {
+        node.name: input_data[i : i + 1]
+        for i, node in enumerate(original_session.get_inputs())
+    }
+    expected = original_session.run(None, ort_inputs)[0].tolist()
+
+    prediction, status_code = app.routes.run_inference(input_data)
+
+    assert status_code == 200
+    assert prediction == expected
+
+
+@pytest.mark.slow
+def test_run_inference_with_batching(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that run_inference returns the same label when batching is enabled."""
+    input_data = np.array([[30.0], [2000.0], [7000.0], [1.0]], dtype=np.float32)
+    expected, _ = app.routes.run_inference(input_data)
+
+    monkeypatch.setattr(
+        app.routes, "BATCHER", DynamicBatcher(app.routes.run_batch, max_wait_ms=0)
+    )
+    prediction, status_code = app.routes.run_inference(input_data)
+
+    assert status_code == 200
+    assert prediction == expected == ["Good"]
+
+
+@pytest.mark.slow
+def test_run_inference_batching_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that run_inference gives up on a batch that does not complete in time."""
+    release = threading.Event()
+
+    def run_batch(batch: np.ndarray) -> np.ndarray:
+        release.wait(timeout=5)
+        return app.routes.run_batch(batch)
+
+    monkeypatch.setattr(app.routes, "BATCHER", DynamicBatcher(run_batch, max_wait_ms=0))
+    monkeypatch.setattr(app.routes, "BATCH_TIMEOUT_MS", 10)
+    try:
+        response, status_code = app.routes.run_inference(_EXPECTED_PREPARED)
+    finally:
+        release.set()
+
+    assert status_code == 503
+    assert response == {"error": "Model inference timed out."}
+
+
+@pytest.mark.slow
+def test_run_inference_onnx_backend(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the ONNX Runtime backend returns the same label as the native one."""
+    input_data = np.array([[30.0], [2000.0], [7000.0], [1.0]], dtype=np.float32)
+    expected, _ = app.routes.run_inference(input_data)
+
+    monkeypatch.setattr(app.routes, "TREE_ENSEMBLE", None)
+    prediction, status_code = app.routes.run_inference(input_data)
+
+    assert status_code == 200
+    assert prediction == expected == ["Good"]
+
+
+@pytest.mark.slow
+def test_run_inference_native_backend_skips_session(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that the native backend runs without the ONNX Runtime session."""
+
+    def fail() -> None:
+        raise AssertionError("The ONNX Runtime session should not be used.")
+
+    monkeypatch.setattr(
+        app.routes, "TREE_ENSEMBLE", TreeEnsemble.from_onnx(app.routes.MODEL_PATH)
+    )
+    monkeypatch.setattr(app.routes, "_get_session", fail)
+    input_data = np.array([[30.0], [2000.0], [7000.0], [1.0]], dtype=np.float32)
+
+    # A new thread has no input buffer nor IO binding yet
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        prediction, status_code = executor.submit(
+            app.routes.run_inference, input_data
+        ).result()
+
+    assert status_code == 200
+    assert prediction == ["Good"]
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    "backend_env,expected",
+    [(None, None), ("native", ValueError)],
+    ids=["default", "explicit"],
+)
+def test_load_tree_ensemble_unsupported_model(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    backend_env: Optional[str],
+    expected: Optional[Type[Exception]],
+) -> None:
+    """Test that an unsupported model only fails when native was requested."""
+    model = onnx.load("models/model.onnx")
+    for node in [n for n in model.graph.node if n.op_type == "TreeEnsembleClassifier"]:
+        model.graph.node.remove(node)
+    onnx.save(model, tmp_path / "model.onnx")
+
+    monkeypatch.setattr(app.routes, "MODEL_PATH", str(tmp_path / "model.onnx"))
+    monkeypatch.setattr(app.routes, "INFERENCE_BACKEND", "native")
+    if backend_env is None:
+        monkeypatch.delenv("INFERENCE_BACKEND", raising=False)
+    else:
+        monkeypatch.setenv("INFERENCE_BACKEND", backend_env)
+
+    if expected is None:
+        assert app.routes._load_tree_ensemble() is None
+    else:
+        with pytest.raises(expected):
+            app.routes._load_tree_ensemble()
+
+
+@pytest.mark.slow
+def test_run_inference_invalid_shape() -> None:
+    """Test that run_inference rejects input that does not match the model inputs."""
+    response, status_code = app.routes.run_inference(np.zeros((1, 1), dtype=np.float32))
+
+    assert status_code == 400
+    assert response["error"] == "Invalid input for the ONNX model"
+
+
+@pytest.mark.fast
+@pytest.mark.parametrize(
+    "ort_providers,expected",
+    [
+        ("CPUExecutionProvider", ["CPUExecutionProvider"]),
+        ("UnknownExecutionProvider,CPUExecutionProvider", ["CPUExecutionProvider"]),
+        ("CUDAExecutionProvider", ["CUDAExecutionProvider", "CPUExecutionProvider"]),
+    ],
+    ids=["cpu", "unknown_skipped", "cuda"],
+)
+def test_get_providers(
+    monkeypatch: pytest.MonkeyPatch, ort_providers: str, expected: list
+) -> None:
+    """Test that unavailable providers are skipped and CPU is the last fallback."""
+    monkeypatch.setattr(app.routes, "ORT_PROVIDERS", ort_providers)
+    monkeypatch.setattr(
+        onnxruntime,
+        "get_available_providers",
+        lambda: ["CUDAExecutionProvider", "CPUExecutionProvider"],
+    )
+
+    assert app.routes.get_providers() == expected
+
+
+@pytest.mark.fast
+def test_create_session_options() -> None:
+    """Test the ONNX Runtime options used to load the model."""
+    sess_options = app.routes.create_session_options()
+
+    assert (
+        sess_options.graph_optimization_level
+        == onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    assert sess_options.enable_mem_pattern
+    assert not sess_options.enable_cpu_mem_arena
+
+
+@pytest.mark.slow
+def test_get_session_is_loaded_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that concurrent first calls share a single lazily loaded session."""
+    monkeypatch.setattr(app.routes, "_ort_session", None)
+    monkeypatch.setattr(app.routes, "_model_io", None)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sessions = list(executor.map(lambda _: app.routes._get_session(), range(8)))
+
+    assert all(session is sessions[0] for session in sessions)
+    assert app.routes.get_model_io().n_features == 4
+
+
+@pytest.mark.slow
+def test_create_app_reuses_loaded_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that applications built by create_app share the loaded model."""
+    session = app.routes._get_session()
+    monkeypatch.setattr(
+        onnxruntime,
+        "InferenceSession",
+        lambda *args, **kwargs: pytest.fail("The model was loaded again"),
+    )
+    monkeypatch.setattr(app.routes, "TREE_ENSEMBLE", None)
+
+    for _ in range(2):
+        response = (
+            create_app()
+            .test_client()
+            .post("/predict", data=_VALID_JSON, content_type="application/json")
+        )
+        assert response.status_code == 200
+
+    assert app.routes._get_session() is session
+
+
+@pytest.mark.slow
+def test_warm_up_raises_on_failed_prediction(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that warm_up fails loudly when the dummy prediction fails."""
+    monkeypatch.setattr(
+        app.routes, "run_inference", lambda _: ({"error": "Model failed"}, 400)
+    )
+
+    with pytest.raises(RuntimeError, match="Warm-up prediction failed"):
+        app.routes.warm_up()
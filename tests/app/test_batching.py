@@ -0,0 +1,133 @@
+"""
+Tests for the dynamic batching of inference requests.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.batching import DynamicBatcher
+
+pytestmark = pytest.mark.fast
+
+
+def test_submit_returns_row_output() -> None:
+    """Test that a single request is resolved with its own output row."""
+    batcher = DynamicBatcher(lambda batch: batch.sum(axis=1), max_wait_ms=0)
+
+    future = batcher.submit(np.array([[1.0], [2.0], [3.0], [4.0]]))
+
+    assert future.result(timeout=5) == 10.0
+
+
+def test_submit_copies_features() -> None:
+    """Test that the caller may reuse its array right after submitting it."""
+    started = threading.Event()
+    release = threading.Event()
+
+    def run_batch(batch: np.ndarray) -> np.ndarray:
+        started.set()
+        release.wait(timeout=5)
+        return batch.sum(axis=1)
+
+    batcher = DynamicBatcher(run_batch, max_batch_size=1)
+    features = np.ones(4)
+    first = batcher.submit(features)
+    started.wait(timeout=5)
+    second = batcher.submit(features)
+    features[:] = 0
+    release.set()
+
+    assert first.result(timeout=5) == 4.0
+    assert second.result(timeout=5) == 4.0
+
+
+def test_concurrent_requests_are_batched() -> None:
+    """Test that concurrent requests are coalesced into fewer model calls."""
+    batch_sizes = []
+
+    def run_batch(batch: np.ndarray) -> np.ndarray:
+        batch_sizes.append(len(batch))
+        return batch[:, 0] * 2
+
+    batcher = DynamicBatcher(run_batch, max_batch_size=8, max_wait_ms=50)
+
+    def request(i: int) -> float:
+        return batcher.submit(np.full(4, i)).result(timeout=5)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(request, range(16)))
+
+    assert results == [i * 2 for i in range(16)]
+    assert sum(batch_sizes) == 16
+    assert len(batch_sizes) < 16
+    assert max(batch_sizes) <= 8
+
+
+def test_batch_error_is_propagated() -> None:
+    """Test that a failing model call fails every request of the batch."""
+
+    def run_batch(batch: np.ndarray) -> np.ndarray:
+        raise ValueError("model failure")
+
+    batcher = DynamicBatcher(run_batch, max_wait_ms=0)
+
+    with pytest.raises(ValueError, match="model failure"):
+        batcher.submit(np.zeros(4)).result(timeout=5)
+
+
+def test_stack_error_is_propagated() -> None:
+    """Test that rows which cannot be stacked fail their batch, not the worker."""
+    batcher = DynamicBatcher(
+        lambda batch: batch.sum(axis=1), max_batch_size=2, max_wait_ms=1000
+    )
+
+    first = batcher.submit(np.zeros(4))
+    second = batcher.submit(np.zeros(3))
+
+    for future in (first, second):
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    # The worker survives and serves the next (full) batch
+    futures = [batcher.submit(np.ones(4)) for _ in range(2)]
+    assert [future.result(timeout=5) for future in futures] == [4.0, 4.0]
+
+
+def test_missing_outputs_fail_the_batch() -> None:
+    """Test that a model returning fewer rows than requested fails every request."""
+    batcher = DynamicBatcher(
+        lambda batch: batch[:1], max_batch_size=2, max_wait_ms=1000
+    )
+
+    futures = [batcher.submit(np.zeros(4)) for _ in range(2)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="Expected 2 outputs, got 1"):
+            future.result(timeout=5)
+
+
+def test_cancelled_request_is_skipped() -> None:
+    """Test that a request cancelled while queued is not run."""
+    started = threading.Event()
+    release = threading.Event()
+    batches = []
+
+    def run_batch(batch: np.ndarray) -> np.ndarray:
+        batches.append(batch.copy())
+        started.set()
+        release.wait(timeout=5)
+        return batch.sum(axis=1)
+
+    batcher = DynamicBatcher(run_batch, max_batch_size=1)
+    first = batcher.submit(np.ones(4))
+    started.wait(timeout=5)
+    cancelled = batcher.submit(np.full(4, 2.0))
+    assert cancelled.cancel()
+    last = batcher.submit(np.full(4, 3.0))
+    release.set()
+
+    assert first.result(timeout=5) == 4.0
+    assert last.result(timeout=5) == 12.0
+    assert [batch[0, 0] for batch in batches] == [1.0, 3.0]
@@ -0,0 +1,184 @@
+# pylint: disable=redefined-outer-name,protected-access
+"""
+Tests for the native evaluation of the tree ensemble.
+"""
+
+from typing import Any, List, Optional
+
+import numpy as np
+import onnx
+import onnxruntime  # type: ignore
+import pytest
+from onnx import TensorProto, helper
+
+from app import inference
+from app.inference import TreeEnsemble, export_tree_ensemble
+
+pytestmark = pytest.mark.slow
+
+MODEL_PATHS = ["models/model.onnx", "models/model.fused.onnx"]
+
+
+def _stump_model(
+    labels: List[Any],
+    class_ids: List[int],
+    class_weights: List[float],
+    n_features: Optional[int] = 1,
+) -> onnx.ModelProto:
+    """
+    Build a classifier made of a single tree splitting feature 0 at 0.5.
+
+    :param labels: The class labels, strings or integers.
+    :param class_ids: The class weighted by each leaf, left leaf first.
+    :param class_weights: The weight of each leaf.
+    :param n_features: Width of the model input, None for a symbolic one.
+
+    :return: The ONNX model.
+    """
+    if isinstance(labels[0], str):
+        label_attr, label_type = "classlabels_strings", TensorProto.STRING
+    else:
+        label_attr, label_type = "classlabels_int64s", TensorProto.INT64
+    node = helper.make_node(
+        "TreeEnsembleClassifier",
+        ["input"],
+        ["label", "probabilities"],
+        domain="ai.onnx.ml",
+        nodes_treeids=[0, 0, 0],
+        nodes_nodeids=[0, 1, 2],
+        nodes_featureids=[0, 0, 0],
+        nodes_modes=["BRANCH_LEQ", "LEAF", "LEAF"],
+        nodes_values=[0.5, 0.0, 0.0],
+        nodes_truenodeids=[1, 0, 0],
+        nodes_falsenodeids=[2, 0, 0],
+        class_treeids=[0] * len(class_ids),
+        class_nodeids=[1, 2],
+        class_ids=class_ids,
+        class_weights=class_weights,
+    )
+    node.attribute.append(helper.make_attribute(label_attr, labels))
+    graph = helper.make_graph(
+        [node],
+        "stump",
+        [
+            helper.make_tensor_value_info(
+                "input", TensorProto.FLOAT, [None, n_features or "n_features"]
+            )
+        ],
+        [
+            helper.make_tensor_value_info("label", label_type, [None]),
+            helper.make_tensor_value_info(
+                "probabilities", TensorProto.FLOAT, [None, len(labels)]
+            ),
+        ],
+    )
+    return helper.make_model(
+        graph,
+        opset_imports=[
+            helper.make_opsetid("", 17),
+            helper.make_opsetid("ai.onnx.ml", 3),
+        ],
+        ir_version=8,
+    )
+
+
+@pytest.fixture(scope="module")
+def features() -> np.ndarray:
+    """Random samples plus samples sitting exactly on, and just above, every threshold."""
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(0, 1, (2000, 4)) * [60, 4000, 12000, 3]
+
+    trees = export_tree_ensemble(onnx.load(MODEL_PATHS[0]))
+    branches = np.asarray(trees["true_children"]) >= 0
+    feature_ids = np.asarray(trees["feature_ids"])[branches]
+    thresholds = np.asarray(trees["thresholds"])[branches]
+    edges = samples[: len(thresholds)].astype(np.float32)
+    edges[np.arange(len(thresholds)), feature_ids] = thresholds
+
+    return np.vstack(
+        [samples.astype(np.float32), edges, np.nextafter(edges, np.float32(np.inf))]
+    )
+
+
+@pytest.mark.parametrize("model_path", MODEL_PATHS)
+def test_predict_matches_onnx_runtime(model_path: str, features: np.ndarray) -> None:
+    """Test that the native predictor returns the same labels as ONNX Runtime."""
+    session = onnxruntime.InferenceSession(
+        "models/model.onnx", providers=["CPUExecutionProvider"]
+    )
+    ort_inputs = {
+        node.name: features[:, i : i + 1] for i, node in enumerate(session.get_inputs())
+    }
+    expected = session.run(["output_label"], ort_inputs)[0]
+
+    trees = TreeEnsemble.from_onnx(model_path)
+
+    assert trees.n_features == 4
+    assert trees.predict(features).tolist() == expected.tolist()
+
+
+def test_binary_model_weighting_one_class_is_rejected() -> None:
+    """
+    Test that binary models weighting a single class are left to ONNX Runtime.
+
+    ONNX Runtime only predicts the weighted class when its score is above 0.5,
+    so taking the highest score would predict it for both leaves.
+    """
+    model = _stump_model(["neg", "pos"], [1, 1], [0.3, 0.8])
+    session = onnxruntime.InferenceSession(
+        model.SerializeToString(), providers=["CPUExecutionProvider"]
+    )
+    features = np.array([[0.0], [1.0]], dtype=np.float32)
+
+    assert session.run(["label"], {"input": features})[0].tolist() == ["neg", "pos"]
+    with pytest.raises(ValueError, match="weighting a single class"):
+        export_tree_ensemble(model)
+
+
+@pytest.mark.parametrize(
+    "model,match",
+    [
+        (_stump_model([0, 1], [0, 1], [1.0, 1.0]), "missing"),
+        (_stump_model(["a", "b"], [0, 1], [1.0, 1.0], None), "fixed number"),
+    ],
+    ids=["int_labels", "symbolic_features"],
+)
+def test_export_unsupported_encoding(model: onnx.ModelProto, match: str) -> None:
+    """Test that models ONNX Runtime serves but the export cannot read are rejected."""
+    onnxruntime.InferenceSession(
+        model.SerializeToString(), providers=["CPUExecutionProvider"]
+    )
+
+    with pytest.raises(ValueError, match=match):
+        export_tree_ensemble(model)
+
+
+def test_predict_without_numba(
+    monkeypatch: pytest.MonkeyPatch, features: np.ndarray
+) -> None:
+    """Test that the pure Python fallback returns the same labels as numba."""
+    trees = TreeEnsemble.from_onnx(MODEL_PATHS[0])
+    expected = trees.predict(features[:200])
+
+    monkeypatch.setattr(inference, "_predict", inference._predict_classes)
+
+    assert trees.predict(features[:200]).tolist() == expected.tolist()
+
+
+def test_predict_invalid_shape() -> None:
+    """Test that rows with too few features are rejected."""
+    with pytest.raises(ValueError, match="Expected input of shape"):
+        TreeEnsemble.from_onnx(MODEL_PATHS[0]).predict(
+            np.zeros((1, 2), dtype=np.float32)
+        )
+
+
+def test_export_unsupported_model() -> None:
+    """Test that models without a tree ensemble are rejected."""
+    model = onnx.load(MODEL_PATHS[0])
+    tree_nodes = [n for n in model.graph.node if n.op_type == "TreeEnsembleClassifier"]
+    for node in tree_nodes:
+        model.graph.node.remove(node)
+
+    with pytest.raises(ValueError, match="no TreeEnsembleClassifier"):
+        export_tree_ensemble(model)
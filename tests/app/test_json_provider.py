@@ -0,0 +1,29 @@
+"""
+Tests for the orjson backed JSON provider.
+"""
+
+import numpy as np
+import pytest
+from flask import jsonify
+
+from app import create_app
+
+pytestmark = pytest.mark.fast
+
+
+def test_jsonify_serializes_numpy_arrays() -> None:
+    """Test that numeric NumPy arrays are serialized without converting them."""
+    with create_app().app_context():
+        response = jsonify({"prediction": np.array([0.5, 1.5], dtype=np.float32)})
+
+    assert response.mimetype == "application/json"
+    assert response.data == b'{"prediction":[0.5,1.5]}'
+
+
+def test_loads_accepts_bytes() -> None:
+    """Test that the provider decodes JSON from bytes."""
+    app = create_app()
+
+    assert app.json.loads(b'{"error":"No data provided"}') == {
+        "error": "No data provided"
+    }
@@ -0,0 +1,39 @@
+"""
+Tests for the custom logging setup.
+"""
+
+import logging
+
+import pytest
+
+import app.logger
+from app.logger import END, RED, ColoredFormatter, setup_logger
+
+pytestmark = pytest.mark.fast
+
+
+def test_setup_logger_is_idempotent() -> None:
+    """Test that setting up the same logger twice doesn't duplicate handlers."""
+    logger = setup_logger("test-setup-logger")
+
+    assert setup_logger("test-setup-logger") is logger
+    assert len(logger.handlers) == 1
+
+
+def test_setup_logger_uses_log_level(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the logger level comes from LOG_LEVEL."""
+    monkeypatch.setattr(app.logger, "LOG_LEVEL", "WARNING")
+
+    logger = setup_logger("test-log-level")
+
+    assert logger.isEnabledFor(logging.WARNING)
+    assert not logger.isEnabledFor(logging.INFO)
+
+
+def test_colored_formatter_colors_level_name() -> None:
+    """Test that the level name is colored only in the formatted message."""
+    formatter = ColoredFormatter("%(levelname)s:%(name)s: %(message)s")
+    record = logging.LogRecord("test", logging.ERROR, __file__, 1, "boom", None, None)
+
+    assert formatter.format(record) == f"{RED}ERROR{END}:test: boom"
+    assert record.levelname == "ERROR"
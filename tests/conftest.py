@@ -0,0 +1,36 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import pytest
+
+from app import create_app, routes
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    Create a test client for the Flask application.
+
+    The tests don't change the application's state, so a single application
+    is built for the whole test session.
+    """
+    app = create_app()
+    app.config["TESTING"] = True
+
+    yield app.test_client()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def warm_up(request: pytest.FixtureRequest) -> None:
+    """
+    Run the validation and the model once before the first test.
+
+    One-off costs (loading the model, compiling the native tree ensemble)
+    are then not charged to whichever test happens to run first. The model
+    is only warmed up when slow tests are selected.
+    """
+    routes.validate_input({})
+
+    if any(item.get_closest_marker("slow") for item in request.session.items):
+        routes.warm_up()
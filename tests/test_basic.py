@@ -1,24 +1,18 @@
-# pylint: disable=redefined-outer-name
 """
 Unit tests for basic functionality of the Flask application.
 """
+
 import pytest
 from flask.testing import FlaskClient
+from werkzeug.test import EnvironBuilder
 
-from app import create_app
-
-
-@pytest.fixture
-def client():
-    """Create a test client for the Flask application."""
-    app = create_app()
-    app.config["TESTING"] = True
+pytestmark = pytest.mark.fast
 
-    with app.test_client() as client:
-        yield client
+# Request to the home route, built once and reused by the tests
+_HOME_ENV = EnvironBuilder(path="/", method="GET")
 
 
 def test_home(client: FlaskClient) -> None:
     """Test the home route for the expected message."""
-    response = client.get("/")
+    response = client.open(_HOME_ENV)
     assert response.data == b"Hello, Flask!"